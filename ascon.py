@@ -6,8 +6,9 @@ NIST SP 800-232
 https://ascon.iaik.tugraz.at/
 """
 
-debug = False
-debugpermutation = False
+from time import perf_counter
+
+hook = None  # active AsconHook instance, installed via set_hook()
 
 # === Ascon hash/xof ===
 
@@ -34,40 +35,44 @@ def ascon_hash(message, variant="Ascon-Hash256", hashlength=32, customization=b"
 
     # Initialization
     iv = to_bytes([versions[variant], 0, (b<<4) + a]) + int_to_bytes(taglen, 2) + to_bytes([rate, 0, 0])
+    if hook: hook.enter("init")
     S = bytes_to_state(iv + zero_bytes(32))
-    if debug: printstate(S, "initial value:")
+    if hook: hook.state(S, "initial value:")
 
     ascon_permutation(S, 12)
-    if debug: printstate(S, "initialization:")
+    if hook: hook.state(S, "initialization:")
 
     # Customization
     if customize: 
         z_padding = to_bytes([0x01]) + zero_bytes(rate - (len(customization) % rate) - 1)
         z_length = int_to_bytes(len(customization)*8, 8)
         z_padded = z_length + customization + z_padding
+        if hook: hook.enter("ad", len(customization))
 
         # customization blocks 0,...,m
         for block in range(0, len(z_padded), rate):
             S[0] ^= bytes_to_int(z_padded[block:block+rate])
             ascon_permutation(S, 12)
-        if debug: printstate(S, "customization:")
+        if hook: hook.state(S, "customization:")
 
     # Message Processing (Absorbing)
     m_padding = to_bytes([0x01]) + zero_bytes(rate - (len(message) % rate) - 1)
     m_padded = message + m_padding
+    if hook: hook.enter("msg", len(message))
 
     # message blocks 0,...,n
     for block in range(0, len(m_padded), rate):
         S[0] ^= bytes_to_int(m_padded[block:block+rate])
         ascon_permutation(S, 12)
-    if debug: printstate(S, "process message:")
+    if hook: hook.state(S, "process message:")
 
     # Finalization (Squeezing)
+    if hook: hook.enter("squeeze", hashlength)
     H = b""
     while len(H) < hashlength:
         H += int_to_bytes(S[0], rate)
         ascon_permutation(S, 12)
-    if debug: printstate(S, "finalization:")
+    if hook: hook.state(S, "finalization:"); hook.leave()
     return H[:hashlength]
 
 
@@ -94,30 +99,35 @@ def ascon_mac(key, message, variant="Ascon-Mac", taglength=16):
 
     if variant == "Ascon-PrfShort":
         # Initialization + Message Processing (Absorbing)
+        if hook: hook.enter("init", len(message))
         IV = to_bytes([len(key) * 8, len(message)*8, a + 64, taglength * 8]) + zero_bytes(4)
         S = bytes_to_state(IV + key + message + zero_bytes(16 - len(message)))
-        if debug: printstate(S, "initial value:")
+        if hook: hook.state(S, "initial value:")
 
         ascon_permutation(S, a)
-        if debug: printstate(S, "process message:")
+        if hook: hook.state(S, "process message:")
 
         # Finalization (Squeezing)
+        if hook: hook.enter("squeeze", taglength)
         T = int_to_bytes(S[3] ^ bytes_to_int(key[0:8]), 8) + int_to_bytes(S[4] ^ bytes_to_int(key[8:16]), 8)
+        if hook: hook.leave()
         return T[:taglength]
 
     else: # Ascon-Prf, Ascon-Mac
         # Initialization
         if variant == "Ascon-Mac": tagspec = int_to_bytes(16*8, 4)
         if variant == "Ascon-Prf": tagspec = int_to_bytes(0*8, 4)
+        if hook: hook.enter("init")
         S = bytes_to_state(to_bytes([len(key) * 8, rate * 8, a + 128, a-b]) + tagspec + key + zero_bytes(16))
-        if debug: printstate(S, "initial value:")
+        if hook: hook.state(S, "initial value:")
 
         ascon_permutation(S, a)
-        if debug: printstate(S, "initialization:")
+        if hook: hook.state(S, "initialization:")
 
         # Message Processing (Absorbing)
         m_padding = to_bytes([0x01]) + zero_bytes(msgblocksize - (len(message) % msgblocksize) - 1)
         m_padded = message + m_padding
+        if hook: hook.enter("msg", len(message))
 
         # first s-1 blocks
         for block in range(0, len(m_padded) - msgblocksize, msgblocksize):
@@ -133,16 +143,18 @@ def ascon_mac(key, message, variant="Ascon-Mac", taglength=16):
         S[2] ^= bytes_to_int(m_padded[block+16:block+24])
         S[3] ^= bytes_to_int(m_padded[block+24:block+32])
         S[4] ^= 1
-        if debug: printstate(S, "process message:")
+        if hook: hook.state(S, "process message:")
 
         # Finalization (Squeezing)
+        if hook: hook.enter("final")
         T = b""
         ascon_permutation(S, a)
+        if hook: hook.enter("squeeze", taglength)
         while len(T) < taglength:
             T += int_to_bytes(S[0], 8)  # rate=16
             T += int_to_bytes(S[1], 8)
             ascon_permutation(S, b)
-        if debug: printstate(S, "finalization:")
+        if hook: hook.state(S, "finalization:"); hook.leave()
         return T[:taglength]
 
 
@@ -171,6 +183,7 @@ def ascon_encrypt(key, nonce, associateddata, plaintext, variant="Ascon-AEAD128"
     ascon_process_associated_data(S, b, rate, associateddata)
     ciphertext = ascon_process_plaintext(S, b, rate, plaintext)
     tag = ascon_finalize(S, rate, a, key)
+    if hook: hook.leave()
     return (ciphertext, tag)
 
 
@@ -197,6 +210,7 @@ def ascon_decrypt(key, nonce, associateddata, ciphertext, variant="Ascon-AEAD128
     ascon_process_associated_data(S, b, rate, associateddata)
     plaintext = ascon_process_ciphertext(S, b, rate, ciphertext[:-16])
     tag = ascon_finalize(S, rate, a, key)
+    if hook: hook.leave()
     if tag == ciphertext[-16:]:
         return plaintext
     else:
@@ -219,9 +233,10 @@ def ascon_initialize(S, k, rate, a, b, version, key, nonce):
     returns nothing, updates S
     """
     taglen = 128
+    if hook: hook.enter("init")
     iv = to_bytes([version, 0, (b<<4) + a]) + int_to_bytes(taglen, 2) + to_bytes([rate, 0, 0])
     S[0], S[1], S[2], S[3], S[4] = bytes_to_state(iv + key + nonce)
-    if debug: printstate(S, "initial value:")
+    if hook: hook.state(S, "initial value:")
 
     ascon_permutation(S, a)
 
@@ -231,7 +246,7 @@ def ascon_initialize(S, k, rate, a, b, version, key, nonce):
     S[2] ^= zero_key[2]
     S[3] ^= zero_key[3]
     S[4] ^= zero_key[4]
-    if debug: printstate(S, "initialization:")
+    if hook: hook.state(S, "initialization:")
 
 
 def ascon_process_associated_data(S, b, rate, associateddata):
@@ -243,6 +258,7 @@ def ascon_process_associated_data(S, b, rate, associateddata):
     associateddata: a bytes object of arbitrary length
     returns nothing, updates S
     """
+    if hook: hook.enter("ad", len(associateddata))
     if len(associateddata) > 0:
         a_padding = to_bytes([0x01]) + zero_bytes(rate - (len(associateddata) % rate) - 1)
         a_padded = associateddata + a_padding
@@ -255,7 +271,7 @@ def ascon_process_associated_data(S, b, rate, associateddata):
             ascon_permutation(S, b)
 
     S[4] ^= 1<<63
-    if debug: printstate(S, "process associated data:")
+    if hook: hook.state(S, "process associated data:")
 
 
 def ascon_process_plaintext(S, b, rate, plaintext):
@@ -267,6 +283,7 @@ def ascon_process_plaintext(S, b, rate, plaintext):
     plaintext: a bytes object of arbitrary length
     returns the ciphertext (without tag), updates S
     """
+    if hook: hook.enter("msg", len(plaintext))
     p_lastlen = len(plaintext) % rate
     p_padding = to_bytes([0x01]) + zero_bytes(rate-p_lastlen-1)
     p_padded = plaintext + p_padding
@@ -284,7 +301,7 @@ def ascon_process_plaintext(S, b, rate, plaintext):
     S[0] ^= bytes_to_int(p_padded[block:block+8])
     S[1] ^= bytes_to_int(p_padded[block+8:block+16])
     ciphertext += (int_to_bytes(S[0], 8)[:min(8,p_lastlen)] + int_to_bytes(S[1], 8)[:max(0,p_lastlen-8)])
-    if debug: printstate(S, "process plaintext:")
+    if hook: hook.state(S, "process plaintext:")
     return ciphertext
 
 
@@ -297,6 +314,7 @@ def ascon_process_ciphertext(S, b, rate, ciphertext):
     ciphertext: a bytes object of arbitrary length
     returns the plaintext, updates S
     """
+    if hook: hook.enter("msg", len(ciphertext))
     c_lastlen = len(ciphertext) % rate
     c_padded = ciphertext + zero_bytes(rate - c_lastlen)
 
@@ -317,7 +335,7 @@ def ascon_process_ciphertext(S, b, rate, ciphertext):
     plaintext += (int_to_bytes(S[0] ^ Ci[0], 8) + int_to_bytes(S[1] ^ Ci[1], 8))[:c_lastlen]
     S[0] = (S[0] & bytes_to_int(c_mask[0:8]))  ^ Ci[0] ^ bytes_to_int(c_padx[0:8])
     S[1] = (S[1] & bytes_to_int(c_mask[8:16])) ^ Ci[1] ^ bytes_to_int(c_padx[8:16])
-    if debug: printstate(S, "process ciphertext:")
+    if hook: hook.state(S, "process ciphertext:")
     return plaintext
 
 
@@ -331,15 +349,17 @@ def ascon_finalize(S, rate, a, key):
     returns the tag, updates S
     """
     assert len(key) == 16
+    if hook: hook.enter("final")
     S[rate//8+0] ^= bytes_to_int(key[0:8])
     S[rate//8+1] ^= bytes_to_int(key[8:16])
 
     ascon_permutation(S, a)
 
+    if hook: hook.enter("squeeze", 16)
     S[3] ^= bytes_to_int(key[-16:-8])
     S[4] ^= bytes_to_int(key[-8:])
     tag = int_to_bytes(S[3], 8) + int_to_bytes(S[4], 8)
-    if debug: printstate(S, "finalization:")
+    if hook: hook.state(S, "finalization:")
     return tag
 
 
@@ -353,11 +373,9 @@ def ascon_permutation(S, rounds=1):
     returns nothing, updates S
     """
     assert rounds <= 12
-    if debugpermutation: printwords(S, "permutation input:")
     for r in range(12-rounds, 12):
         # --- add round constants ---
         S[2] ^= (0xf0 - r*0x10 + r*0x1)
-        if debugpermutation: printwords(S, "round constant addition:")
         # --- substitution layer ---
         S[0] ^= S[4]
         S[4] ^= S[3]
@@ -369,14 +387,135 @@ def ascon_permutation(S, rounds=1):
         S[0] ^= S[4]
         S[3] ^= S[2]
         S[2] ^= 0XFFFFFFFFFFFFFFFF
-        if debugpermutation: printwords(S, "substitution layer:")
         # --- linear diffusion layer ---
         S[0] ^= rotr(S[0], 19) ^ rotr(S[0], 28)
         S[1] ^= rotr(S[1], 61) ^ rotr(S[1], 39)
         S[2] ^= rotr(S[2],  1) ^ rotr(S[2],  6)
         S[3] ^= rotr(S[3], 10) ^ rotr(S[3], 17)
         S[4] ^= rotr(S[4],  7) ^ rotr(S[4], 41)
-        if debugpermutation: printwords(S, "linear diffusion layer:")
+
+ascon_permutation_plain = ascon_permutation
+
+
+def ascon_permutation_hooked(S, rounds=1):
+    """
+    Instrumented Ascon permutation, bound to ascon_permutation while a hook is installed - internal helper function.
+    Reports the call to hook.permutation() and, if hook.layers is set, every layer of every round to hook.layer().
+    S: Ascon state, a list of 5 64-bit integers
+    rounds: number of rounds to perform
+    returns nothing, updates S
+    """
+    hook.permutation(S, rounds)
+    if not hook.layers:
+        return ascon_permutation_plain(S, rounds)
+    assert rounds <= 12
+    hook.layer(S, "permutation input:")
+    for r in range(12-rounds, 12):
+        S[2] ^= (0xf0 - r*0x10 + r*0x1)
+        hook.layer(S, "round constant addition:")
+        S[0] ^= S[4]
+        S[4] ^= S[3]
+        S[2] ^= S[1]
+        T = [(S[i] ^ 0xFFFFFFFFFFFFFFFF) & S[(i+1)%5] for i in range(5)]
+        for i in range(5):
+            S[i] ^= T[(i+1)%5]
+        S[1] ^= S[0]
+        S[0] ^= S[4]
+        S[3] ^= S[2]
+        S[2] ^= 0XFFFFFFFFFFFFFFFF
+        hook.layer(S, "substitution layer:")
+        S[0] ^= rotr(S[0], 19) ^ rotr(S[0], 28)
+        S[1] ^= rotr(S[1], 61) ^ rotr(S[1], 39)
+        S[2] ^= rotr(S[2],  1) ^ rotr(S[2],  6)
+        S[3] ^= rotr(S[3], 10) ^ rotr(S[3], 17)
+        S[4] ^= rotr(S[4],  7) ^ rotr(S[4], 41)
+        hook.layer(S, "linear diffusion layer:")
+
+
+# === Ascon profiling/trace hooks ===
+
+class AsconHook:
+    """
+    Profiling/trace hook for the reference model, installed with set_hook().
+    Collects per-phase statistics for the phases "init", "ad" (associated data or CXOF customization),
+    "msg", "final" and "squeeze":
+      calls:   number of permutation calls
+      rounds:  number of permutation rounds
+      nbytes:  number of bytes absorbed (init, ad, msg) or squeezed (squeeze)
+      seconds: wall time spent in the phase
+    callback: optional function(phase, description, S) receiving a copy of the state after each phase
+    layers:   also report every layer of every round to layer() (slow)
+    """
+    PHASES = ("init", "ad", "msg", "final", "squeeze")
+
+    def __init__(self, callback=None, layers=False):
+        self.callback = callback
+        self.layers = layers
+        self.reset()
+
+    def reset(self):
+        self.calls = dict.fromkeys(self.PHASES, 0)
+        self.rounds = dict.fromkeys(self.PHASES, 0)
+        self.nbytes = dict.fromkeys(self.PHASES, 0)
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+        self.phase = "init"
+        self.t0 = None
+
+    def enter(self, phase, nbytes=0):
+        """Start phase (closing the running one) and account nbytes to it."""
+        now = perf_counter()
+        if self.t0 is not None:
+            self.seconds[self.phase] += now - self.t0
+        self.phase = phase
+        self.nbytes[phase] += nbytes
+        self.t0 = now
+
+    def leave(self):
+        """Close the running phase at the end of a top-level call."""
+        if self.t0 is not None:
+            self.seconds[self.phase] += perf_counter() - self.t0
+        self.t0 = None
+
+    def permutation(self, S, rounds):
+        self.calls[self.phase] += 1
+        self.rounds[self.phase] += rounds
+
+    def state(self, S, description):
+        if self.callback: self.callback(self.phase, description, list(S))
+
+    def layer(self, S, description):
+        pass
+
+    def report(self):
+        """Return the collected statistics as a printable table."""
+        lines = ["{:8} {:>8} {:>8} {:>10} {:>12} {:>10}".format("phase", "calls", "rounds", "bytes", "seconds", "ns/byte")]
+        for p in self.PHASES:
+            nsb = "{:.1f}".format(self.seconds[p] * 1e9 / self.nbytes[p]) if self.nbytes[p] else "-"
+            lines.append("{:8} {:8} {:8} {:10} {:12.6f} {:>10}".format(p, self.calls[p], self.rounds[p], self.nbytes[p], self.seconds[p], nsb))
+        return "\n".join(lines)
+
+
+class AsconPrintHook(AsconHook):
+    """
+    Hook printing the state after each phase (and optionally after each permutation layer) to stdout.
+    """
+    def state(self, S, description):
+        printstate(S, description)
+
+    def layer(self, S, description):
+        printwords(S, description)
+
+
+def set_hook(h):
+    """
+    Install h (an AsconHook) as the active profiling/trace hook, or remove the active hook if h is None.
+    Without a hook, the plain permutation is used and hot loops perform no extra checks.
+    returns the previously installed hook
+    """
+    global hook, ascon_permutation
+    previous, hook = hook, h
+    ascon_permutation = ascon_permutation_plain if h is None else ascon_permutation_hooked
+    return previous
 
 
 # === helper functions ===
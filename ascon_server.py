@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+"""
+Local batching service in front of the Ascon reference model (ascon.py).
+
+Clients connect to a Unix socket and send one JSON request per line, e.g.:
+  {"op": "hash", "message": "00ff"}
+  {"op": "xof", "message": "", "hashlength": 64}
+  {"op": "cxof", "message": "", "hashlength": 32, "customization": "6162"}
+  {"op": "encrypt", "key": "...", "nonce": "...", "ad": "...", "plaintext": "..."}
+  {"op": "decrypt", "key": "...", "nonce": "...", "ad": "...", "ciphertext": "..."}
+  {"op": "mac", "key": "...", "message": "...", "variant": "Ascon-Mac", "taglength": 16}
+  {"op": "stats"}
+All byte strings are hex encoded. An optional "id" field is echoed back.
+
+Concurrent requests (from all connections) are grouped into micro-batches of at most
+max_batch requests or max_wait seconds and dispatched to a pool of worker processes.
+Each connection receives its responses in request order, annotated with latency metrics:
+  {"id": ..., "ok": true, "result": ..., "batch": 12, "queue_us": 850, "latency_us": 4210}
+
+Usage:
+  python ascon_server.py --socket /tmp/ascon.sock --max-batch 64 --max-wait 0.002
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ascon import ascon_hash, ascon_mac, ascon_encrypt, ascon_decrypt
+
+SOCKET = "/tmp/ascon.sock"
+MAX_BATCH = 64
+MAX_WAIT = 0.002  # seconds
+
+
+# === request execution (worker processes) ===
+
+def run_request(req):
+    """
+    Execute a single decoded request with the reference model.
+    req: a dict as described in the module docstring
+    returns the JSON-serializable result
+    """
+    h = bytes.fromhex
+    op = req["op"]
+    if op == "hash":
+        return ascon_hash(h(req["message"])).hex()
+    if op == "xof":
+        return ascon_hash(h(req["message"]), "Ascon-XOF128", req.get("hashlength", 32)).hex()
+    if op == "cxof":
+        return ascon_hash(h(req["message"]), "Ascon-CXOF128", req.get("hashlength", 32), h(req.get("customization", ""))).hex()
+    if op == "encrypt":
+        ct, tag = ascon_encrypt(h(req["key"]), h(req["nonce"]), h(req.get("ad", "")), h(req["plaintext"]))
+        return {"ciphertext": ct.hex(), "tag": tag.hex()}
+    if op == "decrypt":
+        pt = ascon_decrypt(h(req["key"]), h(req["nonce"]), h(req.get("ad", "")), h(req["ciphertext"]))
+        return None if pt is None else pt.hex()
+    if op == "mac":
+        return ascon_mac(h(req["key"]), h(req["message"]), req.get("variant", "Ascon-Mac"), req.get("taglength", 16)).hex()
+    raise ValueError("unknown op: {}".format(op))
+
+
+def run_batch(reqs):
+    """
+    Execute a micro-batch of requests in a worker process.
+    reqs: a list of request dicts
+    returns a list of (ok, result or error message) tuples in request order
+    """
+    out = []
+    for req in reqs:
+        try:
+            out.append((True, run_request(req)))
+        except Exception as e:
+            out.append((False, "{}: {}".format(type(e).__name__, e)))
+    return out
+
+
+# === batching server ===
+
+class AsconServer:
+    """
+    Asyncio Unix-socket server grouping concurrent requests into micro-batches.
+    path: Unix socket path
+    max_batch: maximum number of requests per batch
+    max_wait: maximum time (seconds) the first request of a batch waits for more requests
+    workers: number of worker processes (default: os.cpu_count())
+    """
+
+    def __init__(self, path=SOCKET, max_batch=MAX_BATCH, max_wait=MAX_WAIT, workers=None):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers or os.cpu_count()
+        self.pending = None
+        self.pool = None
+        self.requests = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=10000)
+        self.inflight = set()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self.pending = asyncio.Queue()
+        self.pool = ProcessPoolExecutor(self.workers)
+        # warm up all workers so that the first batches do not pay for process start-up
+        await asyncio.gather(*[loop.run_in_executor(self.pool, run_batch, []) for _ in range(self.workers)])
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        batcher = asyncio.create_task(self.batcher())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.pool.shutdown(cancel_futures=True)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def handle(self, reader, writer):
+        """Read requests of one connection and queue their responses in order."""
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue()
+        sender = asyncio.create_task(self.sender(writer, responses))
+        try:
+            while line := await reader.readline():
+                fut = loop.create_future()
+                try:
+                    req = json.loads(line)
+                    if req.get("op") == "stats":
+                        fut.set_result((req, True, self.stats(), None))
+                    else:
+                        await self.pending.put((req, fut, time.perf_counter()))
+                except (ValueError, AttributeError) as e:
+                    fut.set_result(({}, False, "invalid request: {}".format(e), None))
+                await responses.put(fut)
+        finally:
+            await responses.put(None)
+            await sender
+
+    async def sender(self, writer, responses):
+        """Write the responses of one connection in request order."""
+        while (fut := await responses.get()) is not None:
+            req, ok, result, metrics = await fut
+            resp = {"id": req.get("id"), "ok": ok}
+            resp["result" if ok else "error"] = result
+            if metrics:
+                resp.update(metrics)
+            writer.write(json.dumps(resp).encode() + b"\n")
+            await writer.drain()
+        writer.close()
+
+    async def batcher(self):
+        """Collect pending requests into micro-batches and dispatch them to the worker pool."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self.dispatch(batch))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+
+    async def dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        self.requests += len(batch)
+        self.batches += 1
+        t_dispatch = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self.pool, run_batch, [req for req, _, _ in batch])
+        except Exception as e:
+            results = [(False, "{}: {}".format(type(e).__name__, e))] * len(batch)
+        t_done = time.perf_counter()
+        for (req, fut, t_arrival), (ok, result) in zip(batch, results):
+            self.latencies.append(t_done - t_arrival)
+            metrics = {
+                "batch": len(batch),
+                "queue_us": round((t_dispatch - t_arrival) * 1e6),
+                "latency_us": round((t_done - t_arrival) * 1e6),
+            }
+            fut.set_result((req, ok, result, metrics))
+
+    def stats(self):
+        """Return server-wide request, batch and latency statistics."""
+        lat = sorted(self.latencies)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1e6) if lat else 0
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": round(self.requests / self.batches, 2) if self.batches else 0,
+            "p50_us": pct(0.50),
+            "p99_us": pct(0.99),
+            "workers": self.workers,
+        }
+
+
+# === client ===
+
+class AsconClient:
+    """
+    Minimal asyncio client for AsconServer; requests may be pipelined on one connection.
+    """
+
+    def __init__(self, path=SOCKET):
+        self.path = path
+        self.reader = self.writer = None
+
+    async def __aenter__(self):
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def send(self, op, **fields):
+        self.writer.write(json.dumps(dict(op=op, **fields)).encode() + b"\n")
+        await self.writer.drain()
+
+    async def receive(self):
+        return json.loads(await self.reader.readline())
+
+    async def request(self, op, **fields):
+        await self.send(op, **fields)
+        return await self.receive()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batching service for the Ascon reference model.")
+    parser.add_argument("--socket", default=SOCKET, help="Unix socket path (default: %(default)s)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="maximum batch size (default: %(default)s)")
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT, help="maximum batching delay in seconds (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(AsconServer(args.socket, args.max_batch, args.max_wait, args.workers).serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""
+Parallel tree hashing built on Ascon-CXOF128 (ascon.py).
+
+The input is split into leaves of LEAF_SIZE bytes (the last leaf may be shorter, an empty
+input is a single empty leaf). Leaves are hashed independently across a process pool; their
+digests are combined by inner nodes of at most FANOUT children until at most FANOUT digests
+remain, which are combined by the final (root) node. All hashes use Ascon-CXOF128 with
+domain-separated customization strings:
+
+  leaf  i          : CXOF(leaf_i,                          "ascon-tree leaf" || le64(i),                  32 bytes)
+  node  j, level l : CXOF(digest_{j*FANOUT} || ...,         "ascon-tree node" || le8(l) || le64(j),        32 bytes)
+  root             : CXOF(remaining digests,                "ascon-tree root" || le64(LEAF_SIZE) ||
+                                                             le16(FANOUT) || le64(len(input)),             hashlength)
+
+LEAF_SIZE and FANOUT are fixed so that results are reproducible across machines and worker counts.
+
+Usage:
+  python ascon_tree.py [--workers N] [--length BYTES] FILE...
+"""
+
+import argparse
+import os
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from ascon import ascon_hash, int_to_bytes
+
+LEAF_SIZE = 1 << 16  # bytes
+FANOUT = 16
+DIGEST_SIZE = 32  # bytes, leaf and inner node digests
+
+
+def leaf_digest(args):
+    """
+    Hash one leaf - internal helper function (runs in worker processes).
+    args: a tuple (index, leaf bytes)
+    returns the 32-byte leaf digest
+    """
+    index, leaf = args
+    return ascon_hash(leaf, "Ascon-CXOF128", DIGEST_SIZE, b"ascon-tree leaf" + int_to_bytes(index, 8))
+
+
+def node_digest(level, index, children):
+    """
+    Hash the concatenated digests of one inner node - internal helper function.
+    level: tree level of the node (1 for nodes directly above the leaves)
+    index: index of the node within its level
+    children: a list of at most FANOUT digests
+    returns the 32-byte node digest
+    """
+    assert 0 < len(children) <= FANOUT
+    cstm = b"ascon-tree node" + int_to_bytes(level, 1) + int_to_bytes(index, 8)
+    return ascon_hash(b"".join(children), "Ascon-CXOF128", DIGEST_SIZE, cstm)
+
+
+def root_digest(digests, length, hashlength):
+    """
+    Hash the final node - internal helper function.
+    digests: a list of at most FANOUT digests
+    length: total input length in bytes
+    hashlength: the requested output bytelength
+    returns the root digest
+    """
+    assert 0 < len(digests) <= FANOUT
+    cstm = b"ascon-tree root" + int_to_bytes(LEAF_SIZE, 8) + int_to_bytes(FANOUT, 2) + int_to_bytes(length, 8)
+    return ascon_hash(b"".join(digests), "Ascon-CXOF128", hashlength, cstm)
+
+
+def tree_combine(digests, length, hashlength):
+    """
+    Reduce leaf digests level by level and compute the root digest - internal helper function.
+    """
+    level = 0
+    while len(digests) > FANOUT:
+        level += 1
+        digests = [node_digest(level, j, digests[i:i+FANOUT]) for j, i in enumerate(range(0, len(digests), FANOUT))]
+    return root_digest(digests, length, hashlength)
+
+
+def ascon_tree_hash_leaves(leaves, hashlength=32, workers=None):
+    """
+    Ascon tree hash of an iterable of LEAF_SIZE chunks.
+    leaves: an iterable of bytes objects, all of size LEAF_SIZE except the last one
+    hashlength: the requested output bytelength (should be >= 32 for 128-bit security)
+    workers: number of worker processes (default: os.cpu_count(); 1 hashes in this process)
+    returns a bytes object containing the hash tag
+    """
+    workers = workers or os.cpu_count()
+    digests = []
+    length = 0
+    leaves = iter(leaves)
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        # hash leaves in batches so that at most a few leaves per worker are held in memory
+        while batch := list(islice(leaves, 4 * workers)):
+            for leaf in batch:
+                assert len(leaf) <= LEAF_SIZE and length % LEAF_SIZE == 0
+                length += len(leaf)
+            indexed = list(enumerate(batch, len(digests)))
+            digests += pool.map(leaf_digest, indexed) if pool else map(leaf_digest, indexed)
+    finally:
+        if pool: pool.shutdown()
+    if not digests:
+        digests = [leaf_digest((0, b""))]
+    return tree_combine(digests, length, hashlength)
+
+
+def ascon_tree_hash(message, hashlength=32, workers=None):
+    """
+    Ascon tree hash.
+    message: a bytes object of arbitrary length
+    hashlength: the requested output bytelength (should be >= 32 for 128-bit security)
+    workers: number of worker processes (default: os.cpu_count(); 1 hashes in this process)
+    returns a bytes object containing the hash tag
+    """
+    leaves = (message[i:i+LEAF_SIZE] for i in range(0, len(message), LEAF_SIZE))
+    return ascon_tree_hash_leaves(leaves, hashlength, workers)
+
+
+def ascon_tree_hash_file(path, hashlength=32, workers=None):
+    """
+    Ascon tree hash of a file, read leaf by leaf.
+    path: path of the file to hash
+    hashlength: the requested output bytelength (should be >= 32 for 128-bit security)
+    workers: number of worker processes (default: os.cpu_count(); 1 hashes in this process)
+    returns a bytes object containing the hash tag
+    """
+    with open(path, "rb") as f:
+        return ascon_tree_hash_leaves(iter(lambda: f.read(LEAF_SIZE), b""), hashlength, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel Ascon-CXOF128 tree hash.")
+    parser.add_argument("files", nargs="+", help="files to hash")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--length", type=int, default=32, help="output length in bytes (default: %(default)s)")
+    args = parser.parse_args()
+    for path in args.files:
+        print("{}  {}".format(ascon_tree_hash_file(path, args.length, args.workers).hex(), path))
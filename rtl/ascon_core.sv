@@ -34,14 +34,25 @@ module ascon_core (
     output logic                   auth,
     output logic                   auth_valid,
     output logic                   done
+`ifdef ASCON_DUAL
+    ,
+    // Shared Ascon-p permutation (see ascon_dual.sv)
+    output logic                   p_req,
+    input  logic                   p_gnt,
+    output logic       [      3:0] p_round_cnt,
+    output logic [LANES-1:0][63:0] p_state,
+    input  logic [LANES-1:0][63:0] p_state_nx
+`endif
 );
 
   // Core registers
-  logic [LANES-1:0][W64-1:0][CCW-1:0] state;
-  logic [ W128-1:0][CCW-1:0]          ascon_key;
-  logic [      3:0]                   round_cnt;
-  logic [      3:0]                   word_cnt;
-  logic [      1:0]                   hash_cnt;
+  logic [LANES-1:0][63:0] state;
+  logic [    127:0]       ascon_key;
+  logic [      3:0]       round_cnt;
+  logic [      3:0]       word_cnt;
+  logic [      1:0]       hash_cnt;
+  logic [     63:0]       sqz_buf;  // Squeeze buffer: HASH, XOF, CXOF output block
+  logic                   sqz_full;
   logic flag_ad_eot, flag_ad_pad, flag_msg_pad, flag_eoi, auth_intern;
   mode_e mode_r;
 
@@ -70,7 +81,9 @@ module ascon_core (
   fsms_t fsm_nx;  // Next state
 
   // Event signals
+  // - perm_en: A permutation step is performed in this cycle
   logic last_abs_blk;
+  logic perm, perm_en;
   logic add_ad_pad, add_msg_pad;
 
   logic mode_enc_dec, mode_hash_xof;
@@ -84,14 +97,14 @@ module ascon_core (
   assign ld_npub      = (fsm == LD_NPUB) && (bdi_type == D_NONCE) && (bdi_valid > 'd0) && bdi_ready;
   assign ld_npub_done = ld_npub && (word_cnt == (W128 - 1));
   assign init         = (fsm == INIT);
-  assign init_done    = init && (round_cnt == UROL);
+  assign init_done    = init && perm_en && (round_cnt <= UROL);
   assign kadd_2_done  = (fsm == KADD_2) && (flag_eoi || (bdi_valid > 'd0));
 
   logic abs_ad, abs_ad_done, pro_ad, pro_ad_done;
   assign abs_ad      = (fsm == ABS_AD) && (bdi_type == D_AD) && (bdi_valid > 'd0) && bdi_ready;
   assign abs_ad_done = abs_ad && (last_abs_blk || bdi_eot);
   assign pro_ad      = (fsm == PRO_AD);
-  assign pro_ad_done = pro_ad && (round_cnt == UROL);
+  assign pro_ad_done = pro_ad && perm_en && (round_cnt <= UROL);
 
   logic dom_sep_done;
   assign dom_sep_done = (fsm == DOM_SEP);
@@ -101,18 +114,23 @@ module ascon_core (
   assign abs_msg      = abs_msg_part && ((bdo_valid && bdo_ready) || !mode_enc_dec);
   assign abs_msg_done = abs_msg && (last_abs_blk || bdi_eot);
   assign pro_msg      = (fsm == PRO_MSG);
-  assign pro_msg_done = (round_cnt == UROL) && pro_msg;
+  assign pro_msg_done = (round_cnt <= UROL) && pro_msg && perm_en;
 
-  logic kadd_3_done, fin, fin_done, kadd_4_done;
+  logic kadd_3_done, fin, fin_done, sqz_load, sqz_stall, kadd_4_done;
   assign kadd_3_done = (fsm == KADD_3);
   assign fin         = (fsm == FINAL);
-  assign fin_done    = (round_cnt == UROL) && fin;
+  assign fin_done    = (round_cnt <= UROL) && fin && perm_en;
+  assign sqz_load    = fin_done && mode_hash_xof;
   assign kadd_4_done = (fsm == KADD_4);
 
   logic sqz_hash, sqz_hash_done1, sqz_hash_done2, sqz_tag, sqz_tag_done, ver_tag, ver_tag_done;
-  assign sqz_hash       = (fsm == SQZ_HASH) && bdo_valid && bdo_ready;
+  assign sqz_hash       = sqz_full && bdo_ready;
   assign sqz_hash_done1 = (word_cnt == (W64 - 1)) && sqz_hash;
-  assign sqz_hash_done2 = ((hash_cnt == 'd3) && sqz_hash_done1) || (sqz_hash && bdo_eoo);
+  assign sqz_hash_done2 = ((fsm == SQZ_HASH) && sqz_hash_done1) || (sqz_hash && bdo_eoo);
+
+  // HASH, XOF, CXOF: The next block is computed (FINAL) while the squeeze buffer is read.
+  // The last round step waits until the squeeze buffer has been read.
+  assign sqz_stall = fin && mode_hash_xof && (round_cnt <= UROL) && sqz_full && !sqz_hash_done1;
   assign sqz_tag        = (fsm == SQZ_TAG) && bdo_valid && bdo_ready;
   assign sqz_tag_done   = (word_cnt == (W128 - 1)) && sqz_tag;
   assign ver_tag        = (fsm == VER_TAG) && (bdi_type == D_TAG) && bdi_ready;
@@ -124,18 +142,56 @@ module ascon_core (
     (abs_msg && mode_enc_dec     && (word_cnt == (W128 - 1))) ||
     (abs_msg && mode_hash_xof    && (word_cnt == ( W64 - 1)));
 
-  assign add_ad_pad = (fsm == PAD_AD) || (abs_ad && (bdi_valid != '1));
-  assign add_msg_pad = (fsm == PAD_MSG) || (dom_sep_done && flag_eoi) || (abs_msg && (bdi_valid != '1));
+  // Valid bytes and data mask of absorbed words:
+  // - HASH, XOF, CXOF on a 128-bit bus only use the lower 64 bits of bdi/bdo
+  logic [CCW/8-1:0] abs_valid;
+  logic [  CCW-1:0] abs_mask;
+  generate
+    if (CCW == 128) begin : g_abs_128
+      assign abs_valid = mode_hash_xof ? {{8{bdi_valid[7]}}, bdi_valid[7:0]} : bdi_valid;
+      assign abs_mask  = mode_hash_xof ? {64'd0, {64{1'b1}}} : '1;
+    end else begin : g_abs
+      assign abs_valid = bdi_valid;
+      assign abs_mask  = '1;
+    end
+  endgenerate
+
+  assign add_ad_pad = (fsm == PAD_AD) || (abs_ad && (abs_valid != '1));
+  assign add_msg_pad = (fsm == PAD_MSG) || (dom_sep_done && flag_eoi) || (abs_msg && (abs_valid != '1));
 
   // Utility signals
-  logic [3:0] state_idx, lane_idx, word_idx;
+  // - state_idx: Position of the current bus word in the state (in 32-bit units)
+  localparam logic [3:0] W32 = 4'(CCW / 32);  // Number of 32-bit units in one bus word
+  localparam logic [3:0] O192 = 4'd6;  // Position of state bit 192 (in 32-bit units)
+  logic [3:0] state_idx;
   logic [CCW-1:0] state_nx, state_slice, bdi_pad;
+  logic [LANES*64-1:0] state_flat, state_wr;
 
-  assign word_idx = (CCW == 64) ? 'd0 : state_idx % 2;
-  assign lane_idx = (CCW == 64) ? state_idx : state_idx / 2;
-  assign state_slice = state[int'(lane_idx)][int'(word_idx)];
+  logic [127:0] sqz_wide;
+  logic [CCW-1:0] sqz_slice;
 
-  logic [LANES-1:0][W64-1:0][CCW-1:0] asconp_o;
+  assign state_flat  = state;
+  assign sqz_wide    = {64'd0, sqz_buf};
+  assign sqz_slice   = sqz_wide[CCW*int'(word_cnt)+:CCW];
+  assign state_slice = state_flat[32*int'(state_idx)+:CCW];
+
+  always_comb begin
+    state_wr = state_flat;
+    state_wr[32*int'(state_idx)+:CCW] = state_nx;
+  end
+
+  logic [LANES-1:0][63:0] asconp_o;
+  assign perm = (init || pro_ad || pro_msg || fin) && !sqz_stall;
+
+`ifdef ASCON_DUAL
+  // Ascon-p is shared with a second core, rounds are only performed if granted
+  assign p_req       = perm;
+  assign p_round_cnt = round_cnt;
+  assign p_state     = state;
+  assign asconp_o    = p_state_nx;
+  assign perm_en     = perm && p_gnt;
+`else
+  assign perm_en = perm;
 
   // Instantiation of Ascon-p permutation
   asconp asconp_i (
@@ -151,6 +207,7 @@ module ascon_core (
     .x3_o(asconp_o[3]),
     .x4_o(asconp_o[4])
   );
+`endif
 
   /////////////////////
   // Control Signals //
@@ -169,24 +226,25 @@ module ascon_core (
     unique case (fsm)
       LD_KEY:  key_ready = 'd1;
       LD_NPUB: begin
-        state_idx = word_cnt + W192;
+        state_idx = word_cnt * W32 + O192;
         bdi_ready = 'd1;
         state_nx  = bdi;
       end
       ABS_AD: begin
-        state_idx = word_cnt;
+        state_idx = word_cnt * W32;
         bdi_ready = 'd1;
-        bdi_pad   = pad(bdi, bdi_valid);
-        state_nx  = state_slice ^ bdi_pad;
+        bdi_pad   = pad(bdi, abs_valid);
+        state_nx  = state_slice ^ (bdi_pad & abs_mask);
       end
       PAD_AD, PAD_MSG: begin
-        state_idx = word_cnt;
+        state_idx = word_cnt * W32;
+        state_nx  = state_slice ^ 'd1;
       end
       ABS_MSG: begin
-        state_idx = word_cnt;
+        state_idx = word_cnt * W32;
         if (mode_r == M_ENC || mode_hash_xof) begin
-          bdi_pad = pad(bdi, bdi_valid);
-          state_nx = state_slice ^ bdi_pad;
+          bdi_pad = pad(bdi, abs_valid);
+          state_nx = state_slice ^ (bdi_pad & abs_mask);
           bdo = state_nx;
         end else if (mode_r == M_DEC) begin
           bdi_pad = pad2(bdi, state_slice, bdi_valid);
@@ -200,25 +258,25 @@ module ascon_core (
         if (mode_r == M_HASH) bdo = 'd0;
       end
       SQZ_TAG: begin
-        state_idx = word_cnt + W192;
+        state_idx = word_cnt * W32 + O192;
         bdo       = swap(state_slice);
         bdo_valid = 'd1;
         bdo_type  = D_TAG;
         bdo_eot   = word_cnt == (W128 - 1);
       end
-      SQZ_HASH: begin
-        state_idx = word_cnt;
-        bdo       = swap(state_slice);
-        bdo_valid = 'd1;
-        bdo_type  = D_HASH;
-        bdo_eot   = (hash_cnt == 'd3) && (word_cnt == (W64 - 1));
-      end
       VER_TAG: begin
-        state_idx = word_cnt + W192;
+        state_idx = word_cnt * W32 + O192;
         bdi_ready = 'd1;
       end
       default: ;
     endcase
+    // HASH, XOF, CXOF: Squeeze from buffer (FINAL, SQZ_HASH)
+    if (sqz_full) begin
+      bdo       = swap(sqz_slice);
+      bdo_valid = 'd1;
+      bdo_type  = D_HASH;
+      bdo_eot   = (fsm == SQZ_HASH) && (word_cnt == (W64 - 1));
+    end
   end
 
   //////////////////////////
@@ -229,6 +287,7 @@ module ascon_core (
     fsm_nx = fsm;
     // Initialize:
     if (idle_done) begin
+      // Reuse the stored key if no new key is provided (key_valid low)
       if (mode == M_ENC || mode == M_DEC) fsm_nx = key_valid ? LD_KEY : LD_NPUB;
       if (mode == M_HASH || mode == M_XOF || mode == M_CXOF) fsm_nx = INIT;
     end
@@ -248,7 +307,7 @@ module ascon_core (
     // - AEAD: associated data
     // - CXOF: customization string
     if (abs_ad_done) begin
-      if (bdi_valid != '1) begin
+      if (abs_valid != '1) begin
         fsm_nx = PRO_AD;
       end else begin
         if ((word_cnt != (W128 - 1)) && mode_enc_dec) fsm_nx = PAD_AD;
@@ -276,7 +335,7 @@ module ascon_core (
     // - AEAD           : plaintext or ciphertext
     // - HASH, XOF, CXOF: message
     if (abs_msg_done) begin
-      if (bdi_valid != '1) begin
+      if (abs_valid != '1) begin
         if (mode_hash_xof) fsm_nx = FINAL;
         else fsm_nx = KADD_3;
       end else begin
@@ -298,16 +357,15 @@ module ascon_core (
     end
     if (kadd_3_done) fsm_nx = FINAL;
     if (fin_done) begin
-      if (mode_r == M_HASH) fsm_nx = SQZ_HASH;
-      else if (mode_r == M_XOF || mode_r == M_CXOF) begin
-        fsm_nx = SQZ_HASH;
-      end else fsm_nx = KADD_4;
+      // HASH: SQZ_HASH after the 4th block, XOF and CXOF: squeeze until bdo_eoo
+      if (mode_r == M_HASH) fsm_nx = (hash_cnt == 'd3) ? SQZ_HASH : FINAL;
+      else if (mode_r == M_XOF || mode_r == M_CXOF) fsm_nx = FINAL;
+      else fsm_nx = KADD_4;
     end
     // Finalize:
     // - AEAD           : Squeeze or verify tag
     // - HASH, XOF, CXOF: Squeeze hash
     if (kadd_4_done) fsm_nx = (mode_r == M_DEC) ? VER_TAG : SQZ_TAG;
-    if (sqz_hash_done1) fsm_nx = FINAL;
     if (sqz_hash_done2) fsm_nx = IDLE;
     if (sqz_tag_done) fsm_nx = IDLE;
     if (ver_tag_done) fsm_nx = IDLE;
@@ -331,13 +389,9 @@ module ascon_core (
 
   always_ff @(posedge clk) begin
     if (rst == 0) begin
-      // Absorb padded input
-      if (ld_npub || abs_ad || abs_msg) begin
-        state[int'(lane_idx)][int'(word_idx)] <= state_nx;
-      end
-      // Absorb padding word
-      if (fsm == PAD_AD || fsm == PAD_MSG) begin
-        state[int'(lane_idx)][int'(word_idx)] <= state_slice ^ 'd1;
+      // Absorb padded input or padding word
+      if (ld_npub || abs_ad || abs_msg || (fsm == PAD_AD) || (fsm == PAD_MSG)) begin
+        state <= state_wr;
       end
       // State initialization: HASH, XOF, CXOF
       if (idle_done && (mode == M_HASH || mode == M_XOF || mode == M_CXOF)) begin
@@ -353,17 +407,21 @@ module ascon_core (
       // - "npub" is written to state during LOAD_NPUB
       if (ld_npub_done) begin
         state[0] <= IV_AEAD[0+:64];
-        state[1] <= ascon_key[0+:W64];
-        state[2] <= ascon_key[W64+:W64];
+        state[1] <= ascon_key[0+:64];
+        state[2] <= ascon_key[64+:64];
       end
       // Perform Ascon-p permutation
-      if (init || pro_ad || pro_msg || fin) begin
+      if (perm_en) begin
         state <= asconp_o;
       end
+      // Fill squeeze buffer
+      if (sqz_load) begin
+        sqz_buf <= asconp_o[0];
+      end
       // Key addition 2/4
       if (kadd_2_done || kadd_4_done) begin
-        state[3] <= state[3] ^ ascon_key[0+:W64];
-        state[4] <= state[4] ^ ascon_key[W64+:W64];
+        state[3] <= state[3] ^ ascon_key[0+:64];
+        state[4] <= state[4] ^ ascon_key[64+:64];
       end
       // Domain separation
       if (dom_sep_done) begin
@@ -372,12 +430,12 @@ module ascon_core (
       end
       // Key addition 3
       if (kadd_3_done) begin
-        state[2] <= state[2] ^ ascon_key[0+:W64];
-        state[3] <= state[3] ^ ascon_key[W64+:W64];
+        state[2] <= state[2] ^ ascon_key[0+:64];
+        state[3] <= state[3] ^ ascon_key[64+:64];
       end
       // Store key
       if (ld_key) begin
-        ascon_key[word_cnt[(64/CCW)-1:0]] <= key;
+        ascon_key[CCW*int'(word_cnt)+:CCW] <= key;
       end
     end
   end
@@ -407,19 +465,20 @@ module ascon_core (
       if (fsm == PAD_AD) word_cnt <= 'd0;
       if (fsm == PAD_MSG) word_cnt <= 'd0;
       // Setting hash block counter
-      if (mode_r == M_HASH) begin
-        if (sqz_hash_done1) hash_cnt <= hash_cnt + 'd1;
-        if (abs_ad_done && bdi_eoi) hash_cnt <= 'd0;
-      end
+      if (idle_done) hash_cnt <= 'd0;
+      if (sqz_load) hash_cnt <= hash_cnt + 'd1;
       // Setting round counter
-      unique case (fsm_nx)
-        INIT:    round_cnt <= ROUNDS_A;
-        PRO_AD:  round_cnt <= (mode_r == M_CXOF) ? ROUNDS_A : ROUNDS_B;
-        PRO_MSG: round_cnt <= mode_hash_xof ? ROUNDS_A : ROUNDS_B;
-        FINAL:   round_cnt <= ROUNDS_A;
-        default:;
-      endcase
-      if (init || pro_ad || pro_msg || fin) round_cnt <= round_cnt - UROL;
+      if (fsm_nx != fsm) begin
+        unique case (fsm_nx)
+          INIT:    round_cnt <= ROUNDS_A;
+          PRO_AD:  round_cnt <= (mode_r == M_CXOF) ? ROUNDS_A : ROUNDS_B;
+          PRO_MSG: round_cnt <= mode_hash_xof ? ROUNDS_A : ROUNDS_B;
+          FINAL:   round_cnt <= ROUNDS_A;
+          default: ;
+        endcase
+      end
+      if (perm_en) round_cnt <= round_cnt - UROL;
+      if (sqz_load) round_cnt <= ROUNDS_A;
     end
   end
 
@@ -429,7 +488,8 @@ module ascon_core (
 
   always_ff @(posedge clk) begin
     if (rst) begin
-      done <= 'd0;
+      done     <= 'd0;
+      sqz_full <= 'd0;
     end else begin
       if (idle_done) begin
         auth         <= 'd0;
@@ -458,6 +518,9 @@ module ascon_core (
         auth_valid <= 'd1;
         auth <= auth_intern;
       end
+      if (sqz_hash_done1) sqz_full <= 'd0;
+      if (sqz_load) sqz_full <= 'd1;
+      if (sqz_hash_done2) sqz_full <= 'd0;
       if ((fsm != IDLE) && (fsm_nx == IDLE)) done <= 'd1;
     end
   end
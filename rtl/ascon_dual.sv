@@ -0,0 +1,144 @@
+`ifndef INCL_ASCON_DUAL
+`define INCL_ASCON_DUAL
+
+// Licensed under the Creative Commons 1.0 Universal License (CC0), see LICENSE
+// for details.
+//
+// Author: Robert Primas (rprimas 'at' proton.me, https://rprimas.github.io)
+//
+// Implementation of the dual-stream Ascon core.
+// Holds two independent Ascon states (streams) that share one Ascon-p
+// permutation. While one stream permutes, the other stream can use the bus.
+
+`define ASCON_DUAL
+`include "ascon_core.sv"
+
+module ascon_dual (
+    input  logic                   clk,
+    input  logic                   rst,
+    input  logic       [  CCW-1:0] key,
+    input  logic                   key_valid,
+    output logic       [      1:0] key_ready,
+    input  logic       [  CCW-1:0] bdi,
+    input  logic       [CCW/8-1:0] bdi_valid,
+    output logic       [      1:0] bdi_ready,
+    input  data_type_e             bdi_type,
+    input  logic                   bdi_eot,
+    input  logic                   bdi_eoi,
+    input  logic                   bdi_sid,
+    input  logic       [1:0][ 3:0] mode,
+    output logic       [  CCW-1:0] bdo,
+    output logic                   bdo_valid,
+    input  logic       [      1:0] bdo_ready,
+    output data_type_e             bdo_type,
+    output logic                   bdo_eot,
+    input  logic       [      1:0] bdo_eoo,
+    output logic                   bdo_sid,
+    output logic       [      1:0] auth,
+    output logic       [      1:0] auth_valid,
+    output logic       [      1:0] done
+);
+
+  // Per-stream output signals
+  logic       [1:0][CCW-1:0] c_bdo;
+  logic       [1:0]          c_bdo_valid;
+  data_type_e [1:0]          c_bdo_type;
+  logic       [1:0]          c_bdo_eot;
+  logic       [1:0]          c_bdo_req;
+
+  // Shared permutation signals
+  logic [1:0]                  p_req, p_gnt;
+  logic [1:0][3:0]             p_round_cnt;
+  logic [1:0][LANES-1:0][63:0] p_state;
+  logic [LANES-1:0][63:0]      p_state_nx;
+  logic                        p_last;  // Stream that was granted the permutation last
+
+  ///////////////////////
+  // Stream Instances //
+  ///////////////////////
+
+  // - key, bdi, and their control signals are only visible to the stream bdi_sid
+  // - mode, bdo_ready, and bdo_eoo are separate per stream
+  for (genvar i = 0; i < 2; i++) begin : g_stream
+    logic sel;
+    assign sel = (bdi_sid == 1'(i));
+
+    ascon_core ascon_core_i (
+      .clk        (clk),
+      .rst        (rst),
+      .key        (key),
+      .key_valid  (key_valid && sel),
+      .key_ready  (key_ready[i]),
+      .bdi        (bdi),
+      .bdi_valid  (sel ? bdi_valid : '0),
+      .bdi_ready  (bdi_ready[i]),
+      .bdi_type   (sel ? bdi_type : D_NULL),
+      .bdi_eot    (bdi_eot && sel),
+      .bdi_eoi    (bdi_eoi && sel),
+      .mode       (mode_e'(mode[i])),
+      .bdo        (c_bdo[i]),
+      .bdo_valid  (c_bdo_valid[i]),
+      .bdo_ready  (bdo_ready[i] && (bdo_sid == 1'(i))),
+      .bdo_type   (c_bdo_type[i]),
+      .bdo_eot    (c_bdo_eot[i]),
+      .bdo_eoo    (bdo_eoo[i]),
+      .auth       (auth[i]),
+      .auth_valid (auth_valid[i]),
+      .done       (done[i]),
+      .p_req      (p_req[i]),
+      .p_gnt      (p_gnt[i]),
+      .p_round_cnt(p_round_cnt[i]),
+      .p_state    (p_state[i]),
+      .p_state_nx (p_state_nx)
+    );
+
+    // Encryption/decryption output is only available together with its input
+    assign c_bdo_req[i] = c_bdo_valid[i] && bdo_ready[i] &&
+                          ((c_bdo_type[i] != D_MSG) || (sel && (bdi_valid != '0)));
+  end
+
+  //////////////////////////
+  // Permutation Sharing //
+  //////////////////////////
+
+  // Round-robin arbitration, one permutation step per cycle
+  assign p_gnt[0] = p_req[0] && (!p_req[1] || p_last);
+  assign p_gnt[1] = p_req[1] && !p_gnt[0];
+
+  always_ff @(posedge clk) begin
+    if (rst) begin
+      p_last <= 'd0;
+    end else if (p_req != 'd0) begin
+      p_last <= p_gnt[1];
+    end
+  end
+
+  // Instantiation of Ascon-p permutation
+  asconp asconp_i (
+    .round_cnt(p_round_cnt[p_gnt[1]]),
+    .x0_i(p_state[p_gnt[1]][0]),
+    .x1_i(p_state[p_gnt[1]][1]),
+    .x2_i(p_state[p_gnt[1]][2]),
+    .x3_i(p_state[p_gnt[1]][3]),
+    .x4_i(p_state[p_gnt[1]][4]),
+    .x0_o(p_state_nx[0]),
+    .x1_o(p_state_nx[1]),
+    .x2_o(p_state_nx[2]),
+    .x3_o(p_state_nx[3]),
+    .x4_o(p_state_nx[4])
+  );
+
+  ///////////////////////
+  // Output Selection //
+  ///////////////////////
+
+  // Prefer the stream on bdi (coupled encryption/decryption output), then stream 0
+  assign bdo_sid   = c_bdo_req[bdi_sid] ? bdi_sid : !c_bdo_req[0];
+  assign bdo       = c_bdo[bdo_sid];
+  assign bdo_valid = c_bdo_req[bdo_sid];
+  assign bdo_type  = c_bdo_type[bdo_sid];
+  assign bdo_eot   = c_bdo_eot[bdo_sid];
+
+endmodule  // ascon_dual
+
+`endif  // INCL_ASCON_DUAL
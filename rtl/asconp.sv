@@ -70,11 +70,25 @@ module asconp (
     end
   endgenerate
 
-  assign x0_o = x0[UROL];
-  assign x1_o = x1[UROL];
-  assign x2_o = x2[UROL];
-  assign x3_o = x3[UROL];
-  assign x4_o = x4[UROL];
+  // If UROL does not divide the number of rounds (e.g., 8 rounds with UROL = 3), the last
+  // step of the permutation only performs the remaining round_cnt rounds
+  generate
+    if ((ROUNDS_A % UROL == 0) && (ROUNDS_B % UROL == 0)) begin : g_out
+      assign x0_o = x0[UROL];
+      assign x1_o = x1[UROL];
+      assign x2_o = x2[UROL];
+      assign x3_o = x3[UROL];
+      assign x4_o = x4[UROL];
+    end else begin : g_out_rem
+      logic [3:0] n;
+      assign n = (round_cnt < UROL) ? round_cnt : UROL;
+      assign x0_o = x0[n];
+      assign x1_o = x1[n];
+      assign x2_o = x2[n];
+      assign x3_o = x3[n];
+      assign x4_o = x4[n];
+    end
+  endgenerate
 
 endmodule
 
@@ -28,6 +28,24 @@ localparam unsigned CCW = 64;
 `elsif V6
 localparam logic [3:0] UROL = 4;
 localparam unsigned CCW = 64;
+`elsif V7
+localparam logic [3:0] UROL = 1;
+localparam unsigned CCW = 128;
+`elsif V8
+localparam logic [3:0] UROL = 2;
+localparam unsigned CCW = 128;
+`elsif V9
+localparam logic [3:0] UROL = 4;
+localparam unsigned CCW = 128;
+`elsif V10
+localparam logic [3:0] UROL = 3;
+localparam unsigned CCW = 64;
+`elsif V11
+localparam logic [3:0] UROL = 6;
+localparam unsigned CCW = 64;
+`elsif V12
+localparam logic [3:0] UROL = 12;
+localparam unsigned CCW = 64;
 `endif
 `ifndef V1
 `ifndef V2
@@ -35,6 +53,12 @@ localparam unsigned CCW = 64;
 `ifndef V4
 `ifndef V5
 `ifndef V6
+`ifndef V7
+`ifndef V8
+`ifndef V9
+`ifndef V10
+`ifndef V11
+`ifndef V12
 localparam logic [3:0] UROL = 1;
 localparam unsigned CCW = 32;
 `endif
@@ -43,10 +67,17 @@ localparam unsigned CCW = 32;
 `endif
 `endif
 `endif
+`endif
+`endif
+`endif
+`endif
+`endif
+`endif
 
+// Hash, XOF, and CXOF use a 64-bit rate. With a 128-bit bus, only the lower 64 bits of
+// bdi/bdo carry data in these modes.
 localparam logic [3:0] W64 = CCW == 32 ? 4'd2 : 4'd1;  // Number of words in 64 bits
-localparam logic [3:0] W128 = CCW == 32 ? 4'd4 : 4'd2;  // Number of words in 128 bits
-localparam logic [3:0] W192 = CCW == 32 ? 4'd6 : 4'd3;  // Number of words in 192 bits
+localparam logic [3:0] W128 = CCW == 32 ? 4'd4 : CCW == 64 ? 4'd2 : 4'd1;  // Number of words in 128 bits
 
 // Ascon parameters
 localparam unsigned LANES = 5;
@@ -2,10 +2,14 @@
 # SPDX-License-Identifier: CC0-1.0
 
 import cocotb
-from cocotb.triggers import RisingEdge
+from cocotb.triggers import RisingEdge, ReadOnly
 from cocotb.clock import Clock
+from cocotb.utils import get_sim_time
 
+import os
 import random
+import re
+from collections import deque
 from enum import Enum
 
 from ascon import *
@@ -15,8 +19,27 @@ RUNS = range(0, 10)
 # RUNS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 16, 32, 64, 128, 256, 512, 1024]
 CCW = 32
 # CCW = 64
+# CCW = 128
 CCWD8 = CCW // 8
+# HASH, XOF, and CXOF transfer at most 64 bits of data per bus word
+HASHD8 = min(CCWD8, 8)
 STALLS = 0
+# Output lengths (bytes) of the long XOF test, reports output bytes per cycle
+XOF_LONG = [256, 1024, 4096]
+# Send a new key only for the first AEAD transaction of each message length. The following
+# transactions leave "key_valid" low and reuse the key stored in the core.
+KEY_REUSE = 1
+# Keep the signals of the last TRACE_WINDOW transactions in memory and write them to
+# "fail_<test>.vcd" (viewable with "make surf-fail") when a check fails. 0 disables.
+TRACE_WINDOW = 2
+SURFER_RON = "surfer/sim.ron"
+WINDOW = None
+# Count toggles of the state, data bus and FSM registers per transaction and weight them
+# with the cell areas of ACTIVITY_LIB (area as a proxy for switched capacitance). 0 disables.
+ACTIVITY = 1
+ACTIVITY_LIB = "syn/cmos_cells.lib"
+ACTIVITY_CELLS = {"state": "DFF", "fsm": "DFF", "bdi": "BUF", "bdo": "BUF"}
+ACT = None
 
 
 # Needs to match "mode_e" in "rtl/config.sv"
@@ -39,22 +62,22 @@ async def clear_bdi(dut):
     dut.bdo_ready.value = 0
 
 
-# Send data of specific type to dut
-async def send_data(dut, data_in, bdi_type, bdo_ready, bdi_eoi):
+# Send data of specific type to dut (wd8 bytes per bus word)
+async def send_data(dut, data_in, bdi_type, bdo_ready, bdi_eoi, wd8=CCWD8):
     dlen = len(data_in)
     d = 0
     data_out = []
     while d < dlen:
         bdi = 0
         bdi_valid = 0
-        for dd in range(d, min(d + CCWD8, dlen)):
-            bdi |= data_in[dd] << 8 * (dd % CCWD8)
-            bdi_valid |= 1 << (dd % CCWD8)
+        for dd in range(d, min(d + wd8, dlen)):
+            bdi |= data_in[dd] << 8 * (dd % wd8)
+            bdi_valid |= 1 << (dd % wd8)
         dut.bdi.value = bdi
         dut.bdi_valid.value = bdi_valid
         dut.bdi_type.value = bdi_type
-        dut.bdi_eot.value = d + CCWD8 >= dlen
-        dut.bdi_eoi.value = d + CCWD8 >= dlen and bdi_eoi
+        dut.bdi_eot.value = d + wd8 >= dlen
+        dut.bdi_eoi.value = d + wd8 >= dlen and bdi_eoi
         dut.bdo_ready.value = bdo_ready
         if STALLS and (random.randint(0, 10) != 0):
             await clear_bdi(dut)
@@ -66,7 +89,7 @@ async def send_data(dut, data_in, bdi_type, bdo_ready, bdi_eoi):
             for dd in range(CCWD8):
                 if bdi_valid & (1 << dd):
                     data_out.append(bdoo[CCWD8 - 1 - dd])
-            d += CCWD8
+            d += wd8
     await clear_bdi(dut)
     return data_out
 
@@ -89,13 +112,13 @@ async def send_key(dut, key_in):
     dut.key_valid.value = 0
 
 
-# Receive data of specific type from dut
-async def receive_data(dut, type, len=16, bdo_eoo=0):
+# Receive data of specific type from dut (wd8 bytes per bus word)
+async def receive_data(dut, type, len=16, bdo_eoo=0, wd8=CCWD8):
     data = []
     d = 0
     while d < len:
         dut.bdo_ready.value = 1
-        dut.bdo_eoo.value = (d + CCWD8 >= len) & bdo_eoo
+        dut.bdo_eoo.value = (d + wd8 >= len) & bdo_eoo
         if STALLS and (random.randint(0, 10) != 0):
             dut.bdo_ready.value = 0
             dut.bdo_eoo.value = 0
@@ -103,9 +126,9 @@ async def receive_data(dut, type, len=16, bdo_eoo=0):
         if dut.bdo_ready.value and dut.bdo_valid.value and (dut.bdo_type.value == type):
             if VERBOSE >= 3:
                 dut._log.info("bdo:      {:08X}".format(int(dut.bdo.value)))
-            for x in int(dut.bdo.value).to_bytes(CCWD8, byteorder="big"):
+            for x in int(dut.bdo.value).to_bytes(CCWD8, byteorder="big")[:wd8]:
                 data.append(x)
-            d += CCWD8
+            d += wd8
     dut.bdo_ready.value = 0
     dut.bdo_eoo.value = 0
     return data
@@ -141,11 +164,140 @@ async def cycle_cnt(dut):
         if int(dut.fsm.value) == 1:
             if VERBOSE >= 1:
                 dut._log.info("cycles    %d", cycles)
+            activity_report(dut)
             return
         cycles += 1
 
 
-# Test case fails if dut fsm state stays the same for 100 cycles
+# Start counting register and bus toggles
+async def activity_start(dut):
+    global ACT
+    ACT = None
+    if ACTIVITY == 0:
+        return
+    with open(ACTIVITY_LIB) as f:
+        area = dict(re.findall(r"cell\((\w+)\)\s*\{\s*area:\s*([\d.]+)", f.read()))
+    signals = [(n, getattr(dut, n), float(area[c])) for n, c in ACTIVITY_CELLS.items() if hasattr(dut, n)]
+    ACT = dict(signals=signals, toggles={}, nbytes=0, energy=0.0, total_energy=0.0, total_bytes=0)
+    cocotb.start_soon(activity_sample(dut))
+
+
+# Accumulate toggles of all monitored signals after each rising clock edge
+async def activity_sample(dut):
+    last = {}
+    while 1:
+        await RisingEdge(dut.clk)
+        await ReadOnly()
+        for n, h, weight in ACT["signals"]:
+            try:
+                v = int(h.value)
+            except ValueError:
+                continue
+            if n in last:
+                t = bin(v ^ last[n]).count("1")
+                ACT["toggles"][n] = ACT["toggles"].get(n, 0) + t
+                ACT["energy"] += t * weight
+            last[n] = v
+
+
+# Start a new transaction that processes nbytes of data
+def activity_mark(nbytes):
+    if ACT is not None:
+        ACT.update(toggles={}, nbytes=nbytes, energy=0.0)
+
+
+# Log toggles and relative switching energy of the current transaction
+def activity_report(dut):
+    if ACT is None:
+        return
+    ACT["total_energy"] += ACT["energy"]
+    ACT["total_bytes"] += ACT["nbytes"]
+    if VERBOSE >= 1:
+        toggles = " ".join("{}:{}".format(n, t) for n, t in ACT["toggles"].items())
+        dut._log.info("toggles   %s", toggles)
+        dut._log.info("energy    %.0f", ACT["energy"])
+
+
+# Log relative switching energy per byte over all transactions of a test
+def activity_summary(dut, mode):
+    if ACT is None or ACT["total_bytes"] == 0:
+        return
+    dut._log.info(
+        "energy    %s %s: %.1f per byte",
+        os.environ.get("VARIANT", ""),
+        mode.name,
+        ACT["total_energy"] / ACT["total_bytes"],
+    )
+
+
+# Start recording the signals shown in SURFER_RON into a rolling window
+async def trace_start(dut, name):
+    global WINDOW
+    WINDOW = None
+    if TRACE_WINDOW == 0:
+        return
+    with open(SURFER_RON) as f:
+        names = re.findall(r'name: "(\w+)",\n\s*\),', f.read())
+    signals = [(n, getattr(dut, n)) for n in dict.fromkeys(names) if n != "clk" and hasattr(dut, n)]
+    WINDOW = dict(name=name, signals=signals, runs=deque(maxlen=TRACE_WINDOW))
+    cocotb.start_soon(trace_sample(dut))
+
+
+# Sample all recorded signals after each rising clock edge
+async def trace_sample(dut):
+    while 1:
+        await RisingEdge(dut.clk)
+        await ReadOnly()
+        if WINDOW is None or not WINDOW["runs"]:
+            continue
+        t = get_sim_time("ps")
+        WINDOW["runs"][-1].append((t, [str(h.value) for _, h in WINDOW["signals"]]))
+
+
+# Mark the start of a new transaction in the rolling window
+def trace_mark():
+    if WINDOW is not None:
+        WINDOW["runs"].append([])
+
+
+# Write the rolling window as VCD file and a matching Surfer state file
+def trace_dump(dut, reason):
+    if WINDOW is None:
+        return
+    vcd = "fail_{}.vcd".format(WINDOW["name"])
+    sigs = WINDOW["signals"]
+    ids = [chr(34 + i // 90) + chr(33 + i % 90) for i in range(len(sigs))]
+    samples = [s for run in WINDOW["runs"] for s in run]
+    half = (samples[1][0] - samples[0][0]) // 2 if len(samples) > 1 else 500
+    with open(vcd, "w") as f:
+        f.write("$comment {} $end\n$timescale 1ps $end\n$scope module ascon_core $end\n".format(reason))
+        f.write("$var wire 1 ! clk $end\n")
+        for (n, h), i in zip(sigs, ids):
+            f.write("$var wire {} {} {} $end\n".format(len(h), i, n))
+        f.write("$upscope $end\n$enddefinitions $end\n")
+        last = [None] * len(sigs)
+        for t, vals in samples:
+            f.write("#{}\n1!\n".format(t))
+            for k, (v, i) in enumerate(zip(vals, ids)):
+                if v != last[k]:
+                    f.write("{}{}\n".format(v, i) if len(v) == 1 else "b{} {}\n".format(v, i))
+                    last[k] = v
+            f.write("#{}\n0!\n".format(t + half))
+    with open(SURFER_RON) as f:
+        ron = f.read().replace('File("dump.fst")', 'File("{}")'.format(vcd)).replace("format: Fst", "format: Vcd")
+    with open("fail.ron", "w") as f:
+        f.write(ron)
+    dut._log.info("trace     %s written to %s", reason, vcd)
+
+
+# Check condition and dump the trace window on failure
+def check(dut, cond, msg):
+    if not cond:
+        trace_dump(dut, msg)
+    assert cond, msg
+
+
+# Test case fails if dut fsm state stays the same for 1000 cycles without any output
 async def timeout(dut):
     last_fsm = 0
     last_fsm_cycles = 0
@@ -153,13 +305,15 @@ async def timeout(dut):
     while 1:
         await RisingEdge(dut.clk)
         dut_fsm = int(dut.fsm.value)
-        if dut_fsm == last_fsm:
+        if dut.bdo_valid.value and dut.bdo_ready.value:
+            last_fsm_cycles = 0
+        elif dut_fsm == last_fsm:
             last_fsm_cycles += 1
         else:
             last_fsm_cycles = 0
             last_fsm = int(dut.fsm.value)
         if last_fsm_cycles >= 1000:
-            assert False, "Timeout"
+            check(dut, False, "Timeout")
         if dut_fsm == int.from_bytes("IDLE".encode("ascii"), byteorder="big"):
             return
 
@@ -182,6 +336,8 @@ async def test_enc(dut):
     cocotb.start_soon(clock.start(start_high=False))
     await cocotb.start(toggle(dut, "dut.rst", 1))
     await RisingEdge(dut.clk)
+    await trace_start(dut, mode.name)
+    await activity_start(dut)
 
     key = bytearray([random.randint(0, 255) for x in range(16)])
     npub = bytearray([random.randint(0, 255) for x in range(16)])
@@ -189,8 +345,12 @@ async def test_enc(dut):
     log(dut, verbose=2, dashes=1, key=key, npub=npub)
 
     for msglen in RUNS:
+        if KEY_REUSE:
+            key = bytearray([random.randint(0, 255) for x in range(16)])
+            log(dut, verbose=2, dashes=0, key=key)
         for adlen in RUNS:
             dut._log.info("test      %s ad:%d msg:%d", mode.name, adlen, msglen)
+            new_key = (not KEY_REUSE) or (adlen == RUNS[0])
 
             ad = bytearray([random.randint(0, 255) for x in range(adlen)])
             pt = bytearray([random.randint(0, 255) for x in range(msglen)])
@@ -200,12 +360,15 @@ async def test_enc(dut):
 
             log(dut, verbose=2, dashes=0, ad=ad, pt=pt, ct=ct, tag=tag)
 
+            trace_mark()
+            activity_mark(adlen + msglen)
             await cocotb.start(cycle_cnt(dut))
             await cocotb.start(timeout(dut))
             await cocotb.start(toggle(dut, "dut.mode", mode.value))
 
-            # send key
-            await send_key(dut, key)
+            # send key (or reuse the stored key)
+            if new_key:
+                await send_key(dut, key)
 
             # send nonce
             await send_data(dut, npub, 1, 0, (adlen == 0) and (msglen == 0))
@@ -225,12 +388,14 @@ async def test_enc(dut):
 
             # check tag
             for i in range(16):
-                assert tag_hw[i] == tag[i], "tag mismatch"
+                check(dut, tag_hw[i] == tag[i], "tag mismatch")
 
             await RisingEdge(dut.clk)
 
             log(dut, verbose=1, dashes=1)
 
+    activity_summary(dut, mode)
+
 
 # ,------.                                       ,--.
 # |  .-.  \  ,---.  ,---.,--.--.,--. ,--.,---. ,-'  '-.
@@ -250,6 +415,8 @@ async def test_dec(dut):
     cocotb.start_soon(clock.start(start_high=False))
     await cocotb.start(toggle(dut, "dut.rst", 1))
     await RisingEdge(dut.clk)
+    await trace_start(dut, mode.name)
+    await activity_start(dut)
 
     key = bytearray([random.randint(0, 255) for x in range(16)])
     npub = bytearray([random.randint(0, 255) for x in range(16)])
@@ -257,8 +424,12 @@ async def test_dec(dut):
     log(dut, verbose=2, dashes=1, key=key, npub=npub)
 
     for msglen in RUNS:
+        if KEY_REUSE:
+            key = bytearray([random.randint(0, 255) for x in range(16)])
+            log(dut, verbose=2, dashes=0, key=key)
         for adlen in RUNS:
             dut._log.info("test      %s ad:%d msg:%d", mode.name, adlen, msglen)
+            new_key = (not KEY_REUSE) or (adlen == RUNS[0])
 
             ad = bytearray([random.randint(0, 255) for x in range(adlen)])
             pt = bytearray([random.randint(0, 255) for x in range(msglen)])
@@ -270,12 +441,15 @@ async def test_dec(dut):
 
             log(dut, verbose=2, dashes=0, ad=ad, pt=pt, ct=ct, tag=tag)
 
+            trace_mark()
+            activity_mark(adlen + msglen)
             await cocotb.start(cycle_cnt(dut))
             await cocotb.start(timeout(dut))
             await cocotb.start(toggle(dut, "dut.mode", mode.value))
 
-            # send key
-            await send_key(dut, key)
+            # send key (or reuse the stored key)
+            if new_key:
+                await send_key(dut, key)
 
             # send nonce
             await send_data(dut, npub, 1, 0, (adlen == 0) and (msglen == 0))
@@ -294,10 +468,12 @@ async def test_dec(dut):
 
             # check tag verification
             await RisingEdge(dut.clk)
-            assert dut.auth.value == 1
+            check(dut, dut.auth.value == 1, "auth failed")
 
             log(dut, verbose=1, dashes=1)
 
+    activity_summary(dut, mode)
+
 
 # ,--.  ,--.               ,--.
 # |  '--'  | ,--,--. ,---. |  ,---.
@@ -316,6 +492,8 @@ async def test_hash(dut):
     cocotb.start_soon(clock.start(start_high=False))
     await cocotb.start(toggle(dut, "dut.rst", 1))
     await RisingEdge(dut.clk)
+    await trace_start(dut, mode.name)
+    await activity_start(dut)
 
     log(dut, verbose=1, dashes=1)
 
@@ -329,6 +507,8 @@ async def test_hash(dut):
 
         log(dut, verbose=2, dashes=0, msg=msg, hash=hash)
 
+        trace_mark()
+        activity_mark(msglen + 32)
         await cocotb.start(cycle_cnt(dut))
         await cocotb.start(timeout(dut))
         await cocotb.start(toggle(dut, "dut.mode", mode.value))
@@ -341,20 +521,22 @@ async def test_hash(dut):
 
         # send msg
         if msglen > 0:
-            await send_data(dut, msg, 3, 0, 1)
+            await send_data(dut, msg, 3, 0, 1, HASHD8)
 
         # receive hash
-        hash_hw = await receive_data(dut, 5, 32)
+        hash_hw = await receive_data(dut, 5, 32, wd8=HASHD8)
         log(dut, verbose=2, dashes=0, hash_hw=hash_hw)
 
         # check hash
         for i in range(32):
-            assert hash_hw[i] == hash[i], "hash incorrect"
+            check(dut, hash_hw[i] == hash[i], "hash incorrect")
 
         await RisingEdge(dut.clk)
 
         log(dut, 1, 1)
 
+    activity_summary(dut, mode)
+
 
 # ,--.   ,--.,-----. ,------.
 #  \  `.'  /'  .-.  '|  .---'
@@ -373,6 +555,8 @@ async def test_xof(dut):
     cocotb.start_soon(clock.start(start_high=False))
     await cocotb.start(toggle(dut, "dut.rst", 1))
     await RisingEdge(dut.clk)
+    await trace_start(dut, mode.name)
+    await activity_start(dut)
 
     log(dut, verbose=1, dashes=1)
 
@@ -388,6 +572,8 @@ async def test_xof(dut):
 
             log(dut, verbose=2, dashes=0, msg=msg, xof=xof)
 
+            trace_mark()
+            activity_mark(msglen + xoflen)
             await cocotb.start(cycle_cnt(dut))
             await cocotb.start(timeout(dut))
             await cocotb.start(toggle(dut, "dut.mode", mode.value))
@@ -400,20 +586,75 @@ async def test_xof(dut):
 
             # send msg
             if msglen > 0:
-                await send_data(dut, msg, bdi_type=3, bdo_ready=0, bdi_eoi=1)
+                await send_data(dut, msg, bdi_type=3, bdo_ready=0, bdi_eoi=1, wd8=HASHD8)
 
             # receive xof
-            xof_hw = await receive_data(dut, 5, xoflen, bdo_eoo=1)
+            xof_hw = await receive_data(dut, 5, xoflen, bdo_eoo=1, wd8=HASHD8)
             log(dut, verbose=2, dashes=0, xof_hw=xof_hw)
 
             await RisingEdge(dut.clk)
 
             # check hash
             for i in range(xoflen):
-                assert hex(xof_hw[i]) == hex(xof[i]), "xof incorrect"
+                check(dut, xof_hw[i] == xof[i], "xof incorrect")
 
             log(dut, 1, 1)
 
+    activity_summary(dut, mode)
+
+
+@cocotb.test()
+async def test_xof_long(dut):
+
+    # init test
+    random.seed(31415)
+    mode = Mode.Ascon_XOF128
+    clock = Clock(dut.clk, 1, units="ns")
+    cocotb.start_soon(clock.start(start_high=False))
+    await cocotb.start(toggle(dut, "dut.rst", 1))
+    await RisingEdge(dut.clk)
+    await trace_start(dut, mode.name + "_long")
+    await activity_start(dut)
+
+    log(dut, verbose=1, dashes=1)
+
+    msglen = 16
+    for xoflen in XOF_LONG:
+        dut._log.info("test      %s msg:%d xof:%d", mode.name, msglen, xoflen)
+
+        msg = bytearray([random.randint(0, 255) for x in range(msglen)])
+
+        # compute in software
+        xof = ascon_hash(msg, variant="Ascon-XOF128", hashlength=xoflen)
+
+        trace_mark()
+        activity_mark(msglen + xoflen)
+        await cocotb.start(cycle_cnt(dut))
+        await cocotb.start(timeout(dut))
+        await cocotb.start(toggle(dut, "dut.mode", mode.value))
+        t0 = get_sim_time("ns")
+
+        await RisingEdge(dut.clk)
+
+        # send msg
+        await send_data(dut, msg, bdi_type=3, bdo_ready=0, bdi_eoi=1, wd8=HASHD8)
+
+        # receive xof, output rate over the squeeze phase
+        t1 = get_sim_time("ns")
+        xof_hw = await receive_data(dut, 5, xoflen, bdo_eoo=1, wd8=HASHD8)
+        t2 = get_sim_time("ns")
+        dut._log.info("output    %.3f bytes/cycle (%d cycles)", xoflen / (t2 - t1), t2 - t0)
+
+        await RisingEdge(dut.clk)
+
+        # check xof
+        for i in range(xoflen):
+            check(dut, xof_hw[i] == xof[i], "xof incorrect")
+
+        log(dut, 1, 1)
+
+    activity_summary(dut, mode)
+
 
 #  ,-----.,--.   ,--.,-----. ,------.
 # '  .--./ \  `.'  /'  .-.  '|  .---'
@@ -432,6 +673,8 @@ async def test_cxof(dut):
     cocotb.start_soon(clock.start(start_high=False))
     await cocotb.start(toggle(dut, "dut.rst", 1))
     await RisingEdge(dut.clk)
+    await trace_start(dut, mode.name)
+    await activity_start(dut)
 
     log(dut, verbose=1, dashes=1)
 
@@ -463,6 +706,8 @@ async def test_cxof(dut):
 
             log(dut, verbose=2, dashes=0, cstm=cstm, msg=msg, cxof=cxof)
 
+            trace_mark()
+            activity_mark(cstmlen + msglen + cxoflen)
             await cocotb.start(cycle_cnt(dut))
             await cocotb.start(timeout(dut))
             await cocotb.start(toggle(dut, "dut.mode", mode.value))
@@ -470,20 +715,22 @@ async def test_cxof(dut):
             await RisingEdge(dut.clk)
 
             # send customization string
-            await send_data(dut, cstm, bdi_type=2, bdo_ready=0, bdi_eoi=(msglen == 0))
+            await send_data(dut, cstm, bdi_type=2, bdo_ready=0, bdi_eoi=(msglen == 0), wd8=HASHD8)
 
             # send msg
             if msglen > 0:
-                await send_data(dut, msg, bdi_type=3, bdo_ready=0, bdi_eoi=1)
+                await send_data(dut, msg, bdi_type=3, bdo_ready=0, bdi_eoi=1, wd8=HASHD8)
 
             # receive xof
-            cxof_hw = await receive_data(dut, 5, cxoflen, bdo_eoo=1)
+            cxof_hw = await receive_data(dut, 5, cxoflen, bdo_eoo=1, wd8=HASHD8)
             log(dut, verbose=2, dashes=0, cxof_hw=cxof_hw)
 
             await RisingEdge(dut.clk)
 
             # check cxof
             for i in range(cxoflen):
-                assert hex(cxof_hw[i]) == hex(cxof[i]), "cxof incorrect"
+                check(dut, cxof_hw[i] == cxof[i], "cxof incorrect")
 
             log(dut, 1, 1)
+
+    activity_summary(dut, mode)
@@ -0,0 +1,252 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+
+# Test bench of the dual-stream core (rtl/ascon_dual.sv), run with "make dual=1".
+# Two streams run concurrently and share the key/bdi bus: a stream only claims the
+# bus when its core is ready, so one stream can transfer data while the other permutes.
+
+import cocotb
+from cocotb.triggers import RisingEdge, FallingEdge, ReadWrite, Lock, with_timeout
+from cocotb.clock import Clock
+from cocotb.utils import get_sim_time
+
+import random
+
+from ascon import *
+from test import Mode, VERBOSE, RUNS, CCWD8, HASHD8, toggle, log
+
+# Shared key/bdi bus and per-stream lanes of "mode", "bdo_ready", and "bdo_eoo"
+BUS = None
+STREAMS = None
+
+
+# Write the per-stream lanes to dut
+def set_lanes(dut, sid, **kwargs):
+    STREAMS[sid].update(kwargs)
+    dut.mode.value = STREAMS[0]["mode"] | (STREAMS[1]["mode"] << 4)
+    dut.bdo_ready.value = STREAMS[0]["bdo_ready"] | (STREAMS[1]["bdo_ready"] << 1)
+    dut.bdo_eoo.value = STREAMS[0]["bdo_eoo"] | (STREAMS[1]["bdo_eoo"] << 1)
+
+
+# Value of the lane of one stream in a 2-bit signal
+def lane(signal, sid):
+    return (int(signal.value) >> sid) & 1
+
+
+# Reset the shared bus
+def clear_bus(dut):
+    dut.key.value = 0
+    dut.key_valid.value = 0
+    dut.bdi.value = 0
+    dut.bdi_valid.value = 0
+    dut.bdi_type.value = 0
+    dut.bdi_eot.value = 0
+    dut.bdi_eoi.value = 0
+
+
+# Drive the shared bus (and the lanes of stream sid) for one cycle. Streams whose core is
+# ready have priority, other streams only use the bus if it is free (e.g., KADD_2 waits for
+# "bdi_valid" without asserting "bdi_ready").
+async def bus_cycle(dut, sid, ready, mode=0, bdo_ready=0, **signals):
+    while 1:
+        await FallingEdge(dut.clk)
+        if ready is None or lane(ready, sid):
+            break
+        await ReadWrite()
+        if not BUS.locked():
+            break
+    async with BUS:
+        dut.bdi_sid.value = sid
+        for k, v in signals.items():
+            getattr(dut, k).value = v
+        set_lanes(dut, sid, mode=mode, bdo_ready=bdo_ready)
+        await RisingEdge(dut.clk)
+        accepted = ready is None or lane(ready, sid)
+        bdo = None
+        if bdo_ready and dut.bdo_valid.value and int(dut.bdo_sid.value) == sid:
+            bdo = int(dut.bdo.value)
+        set_lanes(dut, sid, mode=0, bdo_ready=0)
+        clear_bus(dut)
+    return accepted, bdo
+
+
+# Start a transaction, the first key word is sent together with the mode
+async def start(dut, sid, mode, key=None, eoi=0):
+    signals = dict(bdi_eot=eoi, bdi_eoi=eoi)
+    if key is not None:
+        signals.update(key=int.from_bytes(key[:CCWD8], "little"), key_valid=1)
+    await bus_cycle(dut, sid, None, mode=mode.value, **signals)
+
+
+# Send key data of stream sid
+async def send_key(dut, sid, key_in):
+    k = 0
+    while k < 16:
+        key = int.from_bytes(key_in[k : k + CCWD8], "little")
+        accepted, _ = await bus_cycle(dut, sid, dut.key_ready, key=key, key_valid=1)
+        if accepted:
+            k += CCWD8
+
+
+# Send data of specific type of stream sid (wd8 bytes per bus word)
+async def send_data(dut, sid, data_in, bdi_type, bdo_ready, bdi_eoi, wd8=CCWD8):
+    dlen = len(data_in)
+    d = 0
+    data_out = []
+    while d < dlen:
+        word = data_in[d : d + wd8]
+        accepted, bdo = await bus_cycle(
+            dut,
+            sid,
+            dut.bdi_ready,
+            bdo_ready=bdo_ready,
+            bdi=int.from_bytes(word, "little"),
+            bdi_valid=(1 << len(word)) - 1,
+            bdi_type=bdi_type,
+            bdi_eot=d + wd8 >= dlen,
+            bdi_eoi=d + wd8 >= dlen and bdi_eoi,
+        )
+        if accepted:
+            if bdo_ready:
+                assert bdo is not None, "stream {}: no bdo".format(sid)
+                data_out += list(bdo.to_bytes(CCWD8, "little")[: len(word)])
+            d += wd8
+    return data_out
+
+
+# Receive data of specific type of stream sid (wd8 bytes per bus word)
+async def receive_data(dut, sid, type, len=16, bdo_eoo=0, wd8=CCWD8):
+    data = []
+    d = 0
+    while d < len:
+        set_lanes(dut, sid, bdo_ready=1, bdo_eoo=(d + wd8 >= len) & bdo_eoo)
+        await RisingEdge(dut.clk)
+        if dut.bdo_valid.value and int(dut.bdo_sid.value) == sid and dut.bdo_type.value == type:
+            data += list(int(dut.bdo.value).to_bytes(CCWD8, "big")[:wd8])
+            d += wd8
+    set_lanes(dut, sid, bdo_ready=0, bdo_eoo=0)
+    return data
+
+
+# AEAD encryption or decryption of stream sid over all ad/msg lengths in RUNS
+async def stream_aead(dut, sid, mode, stats):
+    rng = random.Random(31415 + sid)
+    npub = bytearray([rng.randint(0, 255) for x in range(16)])
+    for msglen in RUNS:
+        key = bytearray([rng.randint(0, 255) for x in range(16)])
+        for adlen in RUNS:
+            ad = bytearray([rng.randint(0, 255) for x in range(adlen)])
+            pt = bytearray([rng.randint(0, 255) for x in range(msglen)])
+
+            # compute in software
+            (ct, tag) = ascon_encrypt(key, npub, ad, pt)
+
+            t0 = get_sim_time("ns")
+            new_key = adlen == RUNS[0]
+            await start(dut, sid, mode, key if new_key else None)
+            if new_key:
+                await send_key(dut, sid, key)
+            await send_data(dut, sid, npub, 1, 0, (adlen == 0) and (msglen == 0))
+            if adlen > 0:
+                await send_data(dut, sid, ad, 2, 0, (msglen == 0))
+            if mode == Mode.Ascon_AEAD128_Enc:
+                if msglen > 0:
+                    ct_hw = await send_data(dut, sid, pt, 3, 1, 1)
+                    assert ct_hw == list(ct), "stream {}: ct mismatch".format(sid)
+                tag_hw = await receive_data(dut, sid, 4)
+                assert tag_hw == list(tag), "stream {}: tag mismatch".format(sid)
+            else:
+                if msglen > 0:
+                    pt_hw = await send_data(dut, sid, ct, 3, 1, 1)
+                    assert pt_hw == list(pt), "stream {}: pt mismatch".format(sid)
+                await send_data(dut, sid, tag, 4, 0, 1)
+                await RisingEdge(dut.clk)
+                assert lane(dut.auth, sid) == 1, "stream {}: auth failed".format(sid)
+            stats[sid] += get_sim_time("ns") - t0
+
+            if VERBOSE >= 2:
+                dut._log.info("stream %d  %s ad:%d msg:%d", sid, mode.name, adlen, msglen)
+
+
+# Hash or XOF of stream sid over all msg lengths in RUNS
+async def stream_hash(dut, sid, mode, stats):
+    rng = random.Random(31415 + sid)
+    for msglen in RUNS:
+        hashlen = 32 if mode == Mode.Ascon_Hash256 else max(((msglen + 7) // 8) * 8, 8)
+        msg = bytearray([rng.randint(0, 255) for x in range(msglen)])
+
+        # compute in software
+        variant = "Ascon-Hash256" if mode == Mode.Ascon_Hash256 else "Ascon-XOF128"
+        hash = ascon_hash(msg, variant=variant, hashlength=hashlen)
+
+        t0 = get_sim_time("ns")
+        await start(dut, sid, mode, eoi=(msglen == 0))
+        if msglen > 0:
+            await send_data(dut, sid, msg, 3, 0, 1, HASHD8)
+        hash_hw = await receive_data(dut, sid, 5, hashlen, mode != Mode.Ascon_Hash256, HASHD8)
+        assert hash_hw == list(hash), "stream {}: hash mismatch".format(sid)
+        stats[sid] += get_sim_time("ns") - t0
+
+        if VERBOSE >= 2:
+            dut._log.info("stream %d  %s msg:%d", sid, mode.name, msglen)
+
+
+# Run two streams one after the other and then interleaved, log their cycle counts
+async def run_streams(dut, stream0, stream1):
+    global BUS, STREAMS
+    BUS = Lock()
+    STREAMS = [dict(mode=0, bdo_ready=0, bdo_eoo=0) for _ in range(2)]
+    clock = Clock(dut.clk, 1, units="ns")
+    cocotb.start_soon(clock.start(start_high=False))
+    set_lanes(dut, 0)
+    clear_bus(dut)
+    dut.bdi_sid.value = 0
+    await cocotb.start(toggle(dut, "dut.rst", 1))
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+    timeout = 100 * len(RUNS) ** 2 * (1 + max(RUNS))
+    cycles = {}
+    for run in ["sequential", "interleaved"]:
+        stats = [0, 0]
+        t0 = get_sim_time("ns")
+        s0 = cocotb.start_soon(stream0[0](dut, 0, stream0[1], stats))
+        if run == "sequential":
+            await with_timeout(s0, timeout, "ns")
+        s1 = cocotb.start_soon(stream1[0](dut, 1, stream1[1], stats))
+        await with_timeout(s0, timeout, "ns")
+        await with_timeout(s1, timeout, "ns")
+        cycles[run] = get_sim_time("ns") - t0
+        dut._log.info("%-11s stream 0 %s: %d, stream 1 %s: %d, both: %d cycles",
+                      run, stream0[1].name, stats[0], stream1[1].name, stats[1], cycles[run])
+        await RisingEdge(dut.clk)
+
+    dut._log.info("speedup   %.2f", cycles["sequential"] / cycles["interleaved"])
+    log(dut, 1, 1)
+
+
+@cocotb.test()
+async def test_dual_aead(dut):
+    await run_streams(
+        dut,
+        (stream_aead, Mode.Ascon_AEAD128_Enc),
+        (stream_aead, Mode.Ascon_AEAD128_Dec),
+    )
+
+
+@cocotb.test()
+async def test_dual_hash(dut):
+    await run_streams(
+        dut,
+        (stream_hash, Mode.Ascon_Hash256),
+        (stream_hash, Mode.Ascon_XOF128),
+    )
+
+
+@cocotb.test()
+async def test_dual_mixed(dut):
+    await run_streams(
+        dut,
+        (stream_hash, Mode.Ascon_XOF128),
+        (stream_aead, Mode.Ascon_AEAD128_Enc),
+    )